@@ -1,15 +1,66 @@
 import os
-import time
+import httpx
 import random
+import asyncio
 import logging
 import argparse
-import requests
 import datetime
 import pandas as pd
-from bs4 import BeautifulSoup
+from types import SimpleNamespace
+from selectolax.lexbor import LexborHTMLParser
 from urllib.parse import quote
-from playwright.sync_api import sync_playwright
-from concurrent.futures import ThreadPoolExecutor, as_completed
+from playwright.async_api import async_playwright
+
+# Single knob for how hard we hit Amazon: caps in-flight requests (httpx and Playwright)
+# across every task sharing the event loop, and sizes the connection pool to match
+MAX_CONCURRENT_REQUESTS = 16
+AMAZON_SEM = asyncio.BoundedSemaphore(MAX_CONCURRENT_REQUESTS)
+
+# One Chromium browser + context, started on the first Playwright fetch and reused after that
+_pw = SimpleNamespace(playwright=None, browser=None, context=None)
+_pw_lock = asyncio.Lock()
+# Tabs open at once on the shared context
+PLAYWRIGHT_SEM = asyncio.BoundedSemaphore(4)
+
+# Fallback selectors grouped into one selector so the tree is walked once;
+# css_first returns whichever alternative comes first in the document
+REVIEW_BODY_SEL = (
+    "span[data-hook='review-body'], div.reviewText, span.review-text, span.review-text-content, "
+    "span[class*='review-text'], span.a-size-base.review-text"
+)
+# Wraps the review body, so it is only tried when none of the above match
+REVIEW_DATA_SEL = "div.a-row.review-data"
+REVIEW_SECTION_SEL = "div#reviewsMedley, div[class*='reviews']"
+PRODUCT_RATING_SEL = (
+    "span.a-icon-alt, span[aria-label*='out of 5 stars'], i.a-icon-star, span.a-icon-star, span.a-star"
+)
+
+# These are tried in order instead. On a product page the broad ASIN/link fallbacks
+# also match carousel items for other products, span.a-price wraps span.a-offscreen
+# (a grouped selector would return the wrapper), and grouping the list selectors
+# would merge the broad fallbacks (e.g. div[class*='review']) into the precise matches.
+# On result cards a brand line's h2 span or any a.a-link-normal can precede the title,
+# so only the precise title/link selectors are grouped, ahead of the broad ones
+PRODUCT_TITLE_SELS = ("h2 a span, span.a-text-normal, div.s-title-instructions span", "h2 span", "span.s-title")
+PRODUCT_URL_SELS = ("h2 a, a.a-link-normal.s-no-outline, a.s-title-instructions, a.s-title", "a.a-link-normal")
+ASIN_SELS = ("input[name='ASIN']", "input[name='asin']", "[data-asin]", "div[data-asin]")
+REVIEWS_LINK_SELS = (
+    "a[data-hook='see-all-reviews-link']", "a[href*='product-reviews']", "a[href*='customer-reviews']",
+    "a.reviews-link", "a[href*='reviews']", "a[class*='reviews']"
+)
+PRODUCT_PRICE_SELS = (
+    "span.a-price span.a-offscreen", "span.a-price-whole", "span.a-price",
+    "div.a-price", "span.a-color-price", "span.price"
+)
+REVIEW_DIVS_SELS = (
+    "div[data-hook='review']", "div.review", "div.a-section.review",
+    "div[class*='review']", "div.review-container", "div.a-row.a-spacing-small.review-data"
+)
+PRODUCT_DIVS_SELS = (
+    "div.s-result-item[data-component-type='s-search-result']",
+    "div.s-main-slot div[data-component-type='s-search-result']",
+    "div.s-result-item", "div.s-main-slot div", "div[data-component-type='s-search-result']"
+)
 
 def setup_parser():
     parser = argparse.ArgumentParser(description="Scrape 20 pages of electronic product data from Amazon with up to 100 reviews per product")
@@ -34,26 +85,82 @@ def get_headers():
         "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/129.0.0.0 Safari/537.36",
         "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8",
         "Accept-Language": "en-US,en;q=0.5",
-        "Accept-Encoding": "gzip, deflate, br",
-        "Connection": "keep-alive",
+        "Accept-Encoding": "gzip, deflate, br, zstd",
         "Upgrade-Insecure-Requests": "1"
     }
 
-def fetch_page(url, headers, use_playwright=False, proxies=None):
+def create_client(proxy=None):
+    # One HTTP/2 connection pool shared by the whole scrape
+    transport = httpx.AsyncHTTPTransport(
+        http2=True,
+        limits=httpx.Limits(max_connections=MAX_CONCURRENT_REQUESTS, max_keepalive_connections=MAX_CONCURRENT_REQUESTS),
+        retries=3,
+        proxy=proxy
+    )
+    return httpx.AsyncClient(transport=transport, headers=get_headers(), timeout=10, follow_redirects=True)
+
+def first_match(node, selectors):
+    for selector in selectors:
+        match = node.css_first(selector)
+        if match:
+            return match
+    return None
+
+def all_matches(node, selectors):
+    for selector in selectors:
+        matches = node.css(selector)
+        if matches:
+            return matches
+    return []
+
+def _extract_reviews(tree, max_reviews, out):
+    """Append review texts from a parsed page to out, up to max_reviews. Returns the number of review blocks found."""
+    review_divs = all_matches(tree, REVIEW_DIVS_SELS)
+    for review in review_divs:
+        if len(out) >= max_reviews:
+            break
+        review_text = review.css_first(REVIEW_BODY_SEL) or review.css_first(REVIEW_DATA_SEL)
+        review_text = review_text.text(strip=True) if review_text else ""
+        if review_text:
+            out.append(review_text)
+    return len(review_divs)
+
+async def get_browser_context():
+    async with _pw_lock:
+        if _pw.context is None:
+            headers = get_headers()
+            _pw.playwright = await async_playwright().start()
+            _pw.browser = await _pw.playwright.chromium.launch(headless=True)
+            _pw.context = await _pw.browser.new_context(
+                user_agent=headers["User-Agent"],
+                extra_http_headers={"Accept-Language": headers["Accept-Language"]}
+            )
+    return _pw.context
+
+async def close_browser():
+    if _pw.browser is not None:
+        await _pw.browser.close()
+        await _pw.playwright.stop()
+        _pw.playwright = _pw.browser = _pw.context = None
+
+async def fetch_page(client, url, use_playwright=False):
     try:
         if use_playwright:
             try:
-                with sync_playwright() as p:
-                    browser = p.chromium.launch(headless=True)
-                    page = browser.new_page()
-                    page.goto(url, wait_until="domcontentloaded", timeout=30000)
-                    html = page.content()
-                    browser.close()
-                    return html
+                context = await get_browser_context()
+                async with PLAYWRIGHT_SEM:
+                    page = await context.new_page()
+                    try:
+                        async with AMAZON_SEM:
+                            await page.goto(url, wait_until="domcontentloaded", timeout=30000)
+                        return await page.content()
+                    finally:
+                        await page.close()
             except Exception as e:
-                logging.warning(f"Playwright failed for {url}: {str(e)}. Falling back to requests.")
+                logging.warning(f"Playwright failed for {url}: {str(e)}. Falling back to httpx.")
         
-        response = requests.get(url, headers=headers, proxies=proxies, timeout=10)
+        async with AMAZON_SEM:
+            response = await client.get(url)
         if response.status_code != 200:
             logging.error(f"Failed to fetch {url}: Status code {response.status_code}")
             return None
@@ -62,7 +169,7 @@ def fetch_page(url, headers, use_playwright=False, proxies=None):
         logging.error(f"Error fetching {url}: {str(e)}")
         return None
 
-def scrape_reviews(product_url, region, headers, use_playwright=False, proxies=None, asin=None):
+async def scrape_reviews(client, product_url, region, use_playwright=False, asin=None):
     logging.debug(f"Scraping reviews for {product_url} (ASIN: {asin})")
     try:
         reviews = []
@@ -70,169 +177,96 @@ def scrape_reviews(product_url, region, headers, use_playwright=False, proxies=N
         max_pages = 10     # Maximum review pages to scrape
         retries = 3        # Number of retries for failed requests
 
-        # Fetch the product page to find the reviews link or confirm ASIN
-        for attempt in range(retries):
-            html = fetch_page(product_url, headers, use_playwright, proxies)
-            if html:
-                break
-            logging.warning(f"Attempt {attempt + 1} failed for {product_url}. Retrying...")
-            time.sleep(random.uniform(2, 5))
+        async def fetch_review_page(base_reviews_url, page_num):
+            url = f"{base_reviews_url}?pageNumber={page_num}"
+            for attempt in range(retries):
+                reviews_html = await fetch_page(client, url, use_playwright)
+                if reviews_html:
+                    return reviews_html
+                logging.warning(f"Attempt {attempt + 1} failed for review page {page_num} of {product_url}")
+                await asyncio.sleep(random.uniform(2, 5))
+            return None
+
+        def fetch_review_pages(base_reviews_url):
+            return asyncio.gather(*[fetch_review_page(base_reviews_url, i) for i in range(1, max_pages + 1)])
+
+        tree = None
+        if asin and asin != "N/A":
+            # The ASIN already came from the search result's data-asin, so the product
+            # page would only confirm it; go straight to the review pages
+            base_reviews_url = f"https://www.amazon.{region}/product-reviews/{asin}"
+            logging.debug(f"Using known ASIN for reviews URL: {base_reviews_url}")
         else:
-            logging.error(f"Failed to fetch {product_url} after {retries} attempts.")
-            return "No reviews found"
+            # Fetch the product page to find the reviews link and ASIN
+            for attempt in range(retries):
+                html = await fetch_page(client, product_url, use_playwright)
+                if html:
+                    break
+                logging.warning(f"Attempt {attempt + 1} failed for {product_url}. Retrying...")
+                await asyncio.sleep(random.uniform(2, 5))
+            else:
+                logging.error(f"Failed to fetch {product_url} after {retries} attempts.")
+                return "No reviews found"
 
-        soup = BeautifulSoup(html, "html.parser")
-        
-        # Try to extract ASIN from the product page if not provided
-        if not asin:
-            asin_elem = (
-                soup.select_one("input[name='ASIN']") or
-                soup.select_one("input[name='asin']") or
-                soup.select_one("[data-asin]") or
-                soup.select_one("div[data-asin]")
-            )
-            asin = asin_elem.get("value") or asin_elem.get("data-asin") if asin_elem else None
+            tree = LexborHTMLParser(html)
+
+            asin_elem = first_match(tree, ASIN_SELS)
+            asin = asin_elem.attributes.get("value") or asin_elem.attributes.get("data-asin") if asin_elem else None
             if not asin:
                 logging.error(f"Could not extract ASIN for {product_url}")
                 return "No reviews found"
             logging.debug(f"Extracted ASIN: {asin}")
 
-        # Find the "See all reviews" link
-        reviews_link = (
-            soup.select_one("a[data-hook='see-all-reviews-link']") or 
-            soup.select_one("a[href*='product-reviews']") or
-            soup.select_one("a[href*='customer-reviews']") or 
-            soup.select_one("a.reviews-link") or 
-            soup.select_one("a[href*='reviews']") or 
-            soup.select_one("a[class*='reviews']")
-        )
-        
-        # Construct the base reviews URL
-        if reviews_link and 'product-reviews' in reviews_link.get('href', ''):
-            # Clean URL to remove unnecessary parameters
-            base_reviews_url = f"https://www.amazon.{region}{reviews_link['href'].split('?')[0]}"
-            logging.debug(f"Found reviews link: {base_reviews_url}")
-        else:
-            # Fallback: Use simple URL format
-            base_reviews_url = f"https://www.amazon.{region}/product-reviews/{asin}"
-            logging.debug(f"Constructed reviews URL using ASIN: {base_reviews_url}")
+            # Find the "See all reviews" link
+            reviews_link = first_match(tree, REVIEWS_LINK_SELS)
 
-        # Scrape review pages concurrently
-        with ThreadPoolExecutor(max_workers=5) as executor:
-            future_to_page = {
-                executor.submit(fetch_page, f"{base_reviews_url}?pageNumber={i}", headers, use_playwright, proxies): i 
-                for i in range(1, max_pages + 1)
-            }
-            for future in as_completed(future_to_page):
-                page_num = future_to_page[future]
-                for attempt in range(retries):
-                    try:
-                        reviews_html = future.result()
-                        if not reviews_html:
-                            logging.debug(f"No HTML content for review page {page_num} of {product_url}")
-                            break
-                        
-                        reviews_soup = BeautifulSoup(reviews_html, "html.parser")
-                        review_divs = (
-                            reviews_soup.select("div[data-hook='review']") or 
-                            reviews_soup.select("div.review") or 
-                            reviews_soup.select("div.a-section.review") or 
-                            reviews_soup.select("div[class*='review']") or
-                            reviews_soup.select("div.review-container") or
-                            reviews_soup.select("div.a-row.a-spacing-small.review-data")
-                        )
-                        
-                        if not review_divs:
-                            logging.debug(f"No reviews found on page {page_num} for {product_url}")
-                            break
-                        
-                        for review in review_divs:
-                            review_text = (
-                                review.select_one("span[data-hook='review-body']") or 
-                                review.select_one("div.reviewText") or 
-                                review.select_one("span.review-text") or 
-                                review.select_one("span.review-text-content") or 
-                                review.select_one("div.a-row.review-data") or 
-                                review.select_one("span[class*='review-text']") or
-                                review.select_one("span.a-size-base.review-text")
-                            )
-                            review_text = review_text.get_text(strip=True) if review_text else "No text"
-                            if review_text != "No text" and len(reviews) < max_reviews:
-                                reviews.append(review_text)
-                        
-                        logging.debug(f"Collected {len(reviews)} reviews from page {page_num} for {product_url}")
-                        break  # Exit retry loop if successful
-                    except Exception as e:
-                        logging.warning(f"Attempt {attempt + 1} failed for review page {page_num} of {product_url}: {str(e)}")
-                        # Try Playwright as fallback on last attempt
-                        if attempt == retries - 1 and not use_playwright:
-                            logging.debug(f"Retrying review page {page_num} with Playwright")
-                            html = fetch_page(f"{base_reviews_url}?pageNumber={page_num}", headers, True, proxies)
-                            if html:
-                                reviews_soup = BeautifulSoup(html, "html.parser")
-                                review_divs = (
-                                    reviews_soup.select("div[data-hook='review']") or 
-                                    reviews_soup.select("div.review") or 
-                                    reviews_soup.select("div.a-section.review") or 
-                                    reviews_soup.select("div[class*='review']") or
-                                    reviews_soup.select("div.review-container") or
-                                    reviews_soup.select("div.a-row.a-spacing-small.review-data")
-                                )
-                                for review in review_divs:
-                                    review_text = (
-                                        review.select_one("span[data-hook='review-body']") or 
-                                        review.select_one("div.reviewText") or 
-                                        review.select_one("span.review-text") or 
-                                        review.select_one("span.review-text-content") or 
-                                        review.select_one("div.a-row.review-data") or 
-                                        review.select_one("span[class*='review-text']") or
-                                        review.select_one("span.a-size-base.review-text")
-                                    )
-                                    review_text = review_text.get_text(strip=True) if review_text else "No text"
-                                    if review_text != "No text" and len(reviews) < max_reviews:
-                                        reviews.append(review_text)
-                                logging.debug(f"Collected {len(reviews)} reviews from page {page_num} with Playwright")
-                                break
-                        time.sleep(random.uniform(2, 5))
-                
-                if len(reviews) >= max_reviews:
-                    logging.debug(f"Reached maximum reviews ({max_reviews}) for {product_url}")
-                    break
-                if not review_divs and page_num > 1:  # Stop if no reviews found on a later page
+            # Construct the base reviews URL
+            if reviews_link and 'product-reviews' in (reviews_link.attributes.get('href') or ''):
+                # Clean URL to remove unnecessary parameters
+                base_reviews_url = f"https://www.amazon.{region}{reviews_link.attributes['href'].split('?')[0]}"
+                logging.debug(f"Found reviews link: {base_reviews_url}")
+            else:
+                # Fallback: Use simple URL format
+                base_reviews_url = f"https://www.amazon.{region}/product-reviews/{asin}"
+                logging.debug(f"Constructed reviews URL using ASIN: {base_reviews_url}")
+
+        # Review pages are fetched concurrently, then parsed in page order
+        pages_html = await fetch_review_pages(base_reviews_url)
+
+        # Second pass: retry every page that failed over httpx in one batch of Playwright tabs
+        failed = [page_num for page_num, reviews_html in enumerate(pages_html, 1) if not reviews_html]
+        if failed and not use_playwright:
+            logging.debug(f"Retrying review pages {failed} of {product_url} with Playwright")
+            retried = await asyncio.gather(*[
+                fetch_page(client, f"{base_reviews_url}?pageNumber={page_num}", True) for page_num in failed
+            ])
+            for page_num, reviews_html in zip(failed, retried):
+                pages_html[page_num - 1] = reviews_html
+        for page_num, reviews_html in enumerate(pages_html, 1):
+            if not reviews_html:
+                logging.debug(f"No HTML content for review page {page_num} of {product_url}")
+                continue
+
+            if not _extract_reviews(LexborHTMLParser(reviews_html), max_reviews, reviews):
+                logging.debug(f"No reviews found on page {page_num} for {product_url}")
+                if page_num > 1:  # Stop if no reviews found on a later page
                     logging.debug(f"Stopping review scrape for {product_url} at page {page_num}: no more reviews")
                     break
-                time.sleep(random.uniform(2, 5))
+                continue
+
+            logging.debug(f"Collected {len(reviews)} reviews from page {page_num} for {product_url}")
+            if len(reviews) >= max_reviews:
+                logging.debug(f"Reached maximum reviews ({max_reviews}) for {product_url}")
+                break
         
-        # Fallback: Check product page for reviews
-        if not reviews:
-            review_divs = (
-                soup.select("div[data-hook='review']") or 
-                soup.select("div.review") or 
-                soup.select("div.a-section.review") or 
-                soup.select("div[class*='review']") or
-                soup.select("div.review-container") or
-                soup.select("div.a-row.a-spacing-small.review-data")
-            )
-            for review in review_divs:
-                review_text = (
-                    review.select_one("span[data-hook='review-body']") or 
-                    review.select_one("div.reviewText") or 
-                    review.select_one("span.review-text") or 
-                    review.select_one("span.review-text-content") or 
-                    review.select_one("div.a-row.review-data") or 
-                    review.select_one("span[class*='review-text']") or
-                    review.select_one("span.a-size-base.review-text")
-                )
-                review_text = review_text.get_text(strip=True) if review_text else "No text"
-                if review_text != "No text" and len(reviews) < max_reviews:
-                    reviews.append(review_text)
-                if len(reviews) >= max_reviews:
-                    break
+        # Fallback: Check product page for reviews, if it was fetched
+        if not reviews and tree is not None:
+            _extract_reviews(tree, max_reviews, reviews)
         
         # Log if no reviews were found
         if not reviews:
-            review_section = soup.select_one("div#reviewsMedley") or soup.select_one("div[class*='reviews']")
-            logging.debug(f"No reviews found for {product_url}. Review section: {str(review_section)[:500] if review_section else 'None'}")
+            review_section = tree.css_first(REVIEW_SECTION_SEL) if tree is not None else None
+            logging.debug(f"No reviews found for {product_url}. Review section: {review_section.html[:500] if review_section else 'None'}")
         
         result = "; ".join(reviews) if reviews else "No reviews found"
         logging.info(f"Collected {len(reviews)} reviews for {product_url}")
@@ -241,49 +275,24 @@ def scrape_reviews(product_url, region, headers, use_playwright=False, proxies=N
         logging.error(f"Error scraping reviews for {product_url}: {str(e)}")
         return "No reviews found"
 
-def scrape_product(product, domain, region, headers, use_playwright, proxies):
+async def scrape_product(client, product, domain, region, use_playwright):
     try:
-        title_elem = (
-            product.select_one("h2 a span") or 
-            product.select_one("span.a-text-normal") or 
-            product.select_one("div.s-title-instructions span") or 
-            product.select_one("h2 span") or 
-            product.select_one("span.s-title")
-        )
-        title = title_elem.get_text(strip=True) if title_elem else "N/A"
+        title_elem = first_match(product, PRODUCT_TITLE_SELS)
+        title = title_elem.text(strip=True) if title_elem else "N/A"
         
-        price_elem = (
-            product.select_one("span.a-price span.a-offscreen") or 
-            product.select_one("span.a-price-whole") or 
-            product.select_one("span.a-price") or 
-            product.select_one("div.a-price") or 
-            product.select_one("span.a-color-price") or 
-            product.select_one("span.price")
-        )
-        price = price_elem.get_text(strip=True) if price_elem else "N/A"
+        price_elem = first_match(product, PRODUCT_PRICE_SELS)
+        price = price_elem.text(strip=True) if price_elem else "N/A"
         
-        rating_elem = (
-            product.select_one("span.a-icon-alt") or 
-            product.select_one("span[aria-label*='out of 5 stars']") or 
-            product.select_one("i.a-icon-star") or 
-            product.select_one("span.a-icon-star") or 
-            product.select_one("span.a-star")
-        )
-        rating = rating_elem.get_text(strip=True).split()[0] if rating_elem else "N/A"
+        rating_elem = product.css_first(PRODUCT_RATING_SEL)
+        rating = rating_elem.text(strip=True).split()[0] if rating_elem else "N/A"
         
-        asin_elem = product.get("data-asin")
+        asin_elem = product.attributes.get("data-asin")
         asin = asin_elem if asin_elem else "N/A"
         
-        url_elem = (
-            product.select_one("h2 a") or 
-            product.select_one("a.a-link-normal.s-no-outline") or 
-            product.select_one("a.a-link-normal") or 
-            product.select_one("a.s-title-instructions") or 
-            product.select_one("a.s-title")
-        )
-        product_url = domain + url_elem["href"] if url_elem and url_elem.get("href") else "N/A"
+        url_elem = first_match(product, PRODUCT_URL_SELS)
+        product_url = domain + url_elem.attributes["href"] if url_elem and url_elem.attributes.get("href") else "N/A"
         
-        reviews = scrape_reviews(product_url, region, headers, use_playwright, proxies, asin=asin) if product_url != "N/A" and asin != "N/A" else "No reviews found"
+        reviews = await scrape_reviews(client, product_url, region, use_playwright, asin=asin) if product_url != "N/A" and asin != "N/A" else "No reviews found"
         
         if title != "N/A" or price != "N/A":
             return {
@@ -299,53 +308,38 @@ def scrape_product(product, domain, region, headers, use_playwright, proxies):
         logging.error(f"Error processing product: {str(e)}")
         return None
 
-def scrape_amazon(search_query, pages, region, output_file, verbose=False, use_playwright=False):
+async def scrape_amazon(client, search_query, pages, region, output_file, verbose=False, use_playwright=False):
     base_url = f"https://www.amazon.{region}/s"
     domain = f"https://www.amazon.{region}"
     products = []
-    headers = get_headers()
-    proxies = None  # Add your proxy, e.g., {"http": "http://your_proxy:port", "https": "http://your_proxy:port"}
     
-    def fetch_search_page(page):
+    async def fetch_search_page(page):
         url = f"{base_url}?k={quote(search_query)}&page={page}"
         logging.info(f"Scraping {search_query} page {page}: {url}")
-        html = fetch_page(url, headers, use_playwright, proxies)
+        html = await fetch_page(client, url, use_playwright)
         if not html:
             return []
         
-        soup = BeautifulSoup(html, "html.parser")
-        product_divs = (
-            soup.select("div.s-result-item[data-component-type='s-search-result']") or 
-            soup.select("div.s-main-slot div[data-component-type='s-search-result']") or 
-            soup.select("div.s-result-item") or 
-            soup.select("div.s-main-slot div") or 
-            soup.select("div[data-component-type='s-search-result']")
-        )
+        tree = LexborHTMLParser(html)
+        product_divs = all_matches(tree, PRODUCT_DIVS_SELS)
         
         if not product_divs:
             logging.warning(f"No products found for {search_query} on page {page}. Possible CAPTCHA or layout change.")
             return []
         
-        page_products = []
-        with ThreadPoolExecutor(max_workers=10) as executor:
-            future_to_product = {
-                executor.submit(scrape_product, product, domain, region, headers, use_playwright, proxies): product 
-                for product in product_divs
-            }
-            for future in as_completed(future_to_product):
-                product_data = future.result()
-                if product_data:
-                    product_data["Category"] = search_query
-                    page_products.append(product_data)
-        
-        logging.info(f"Scraped {len(page_products)} products for {search_query} on page {page}")
-        return page_products
+        logging.info(f"Found {len(product_divs)} products for {search_query} on page {page}")
+        return product_divs
     
-    with ThreadPoolExecutor(max_workers=5) as executor:
-        future_to_page = {executor.submit(fetch_search_page, page): page for page in range(1, pages + 1)}
-        for future in as_completed(future_to_page):
-            products.extend(future.result())
-            time.sleep(random.uniform(2, 5))
+    # One flat batch of product tasks across all search pages; AMAZON_SEM does the throttling
+    search_results = await asyncio.gather(*[fetch_search_page(page) for page in range(1, pages + 1)])
+    product_divs = [product for page_divs in search_results for product in page_divs]
+    results = await asyncio.gather(*[
+        scrape_product(client, product, domain, region, use_playwright) for product in product_divs
+    ])
+    for product_data in results:
+        if product_data:
+            product_data["Category"] = search_query
+            products.append(product_data)
     
     if products:
         # Remove URL and Page columns before saving
@@ -358,11 +352,7 @@ def scrape_amazon(search_query, pages, region, output_file, verbose=False, use_p
     
     return products
 
-def main():
-    parser = setup_parser()
-    args = parser.parse_args()
-    setup_logging(args.verbose)
-    
+async def main_async(args):
     categories = {
         "Mobiles": "smartphones",
         "Headphones": "headphones",
@@ -373,15 +363,21 @@ def main():
     os.makedirs(args.output_dir, exist_ok=True)
     
     all_products = []
-    for category, query in categories.items():
-        output_file = os.path.join(args.output_dir, f"{category.lower().replace(' ', '_')}_data.csv")
-        logging.info(f"Starting scrape for {category} (query: {query})")
-        try:
-            products = scrape_amazon(query, 20, args.region, output_file, args.verbose, args.use_playwright)
-            all_products.extend(products)
-        except Exception as e:
-            logging.error(f"Error processing category {category}: {str(e)}")
-            continue
+    proxy = None  # Add your proxy, e.g., "http://your_proxy:port"
+    try:
+        async with create_client(proxy) as client:
+            for category, query in categories.items():
+                output_file = os.path.join(args.output_dir, f"{category.lower().replace(' ', '_')}_data.csv")
+                logging.info(f"Starting scrape for {category} (query: {query})")
+                try:
+                    products = await scrape_amazon(client, query, 20, args.region, output_file, args.verbose, args.use_playwright)
+                    all_products.extend(products)
+                except Exception as e:
+                    logging.error(f"Error processing category {category}: {str(e)}")
+                    continue
+    finally:
+        # Playwright's API is async here, so the browser is shut down by the loop rather than atexit
+        await close_browser()
     
     if all_products:
         combined_file = os.path.join(args.output_dir, "all_electronics_data.csv")
@@ -390,6 +386,12 @@ def main():
         df.to_csv(combined_file, index=False, encoding="utf-8")
         logging.info(f"Saved {len(all_products)} total products to {combined_file}")
 
+def main():
+    parser = setup_parser()
+    args = parser.parse_args()
+    setup_logging(args.verbose)
+    asyncio.run(main_async(args))
+
 
 
 if __name__ == "__main__":
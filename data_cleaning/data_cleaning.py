@@ -9,22 +9,32 @@ file_paths = {
 }
 
 # More comprehensive invalid review values
-invalid_reviews = {"n|a", "review not found", "", "no reviews found", "na", "n/a", "nan","none"}
+invalid_reviews = frozenset({"n|a", "review not found", "", "no reviews found", "na", "n/a", "nan","none"})
+
+# Read every category once and clean them as a single frame, keyed by category.
+# Arrow-backed columns keep the strings in contiguous buffers, and the .str calls
+# below run as Arrow compute kernels instead of per-object Python methods
+df = pd.concat(
+    {category: pd.read_csv(path, engine="pyarrow", dtype_backend="pyarrow") for category, path in file_paths.items()},
+    names=["category"]
+)
+# Missing reviews become "" (an invalid value) so they are dropped with the rest
+df["Reviews"] = df["Reviews"].fillna("").str.strip().str.lower()
+df_cleaned = df[~df["Reviews"].isin(invalid_reviews)]
+groups = dict(tuple(df_cleaned.groupby(level="category", sort=False)))
 
 # Clean and recheck
 cleaned_dfs = {}
 valid_counts = {}
 
-for category, path in file_paths.items():
-    df = pd.read_csv(path)
-    df['Reviews'] = df['Reviews'].astype(str).str.strip().str.lower()
-    df_cleaned = df[~df['Reviews'].isin(invalid_reviews)].copy()
-    
-    cleaned_dfs[category] = df_cleaned
-    valid_counts[category] = len(df_cleaned)
-    
+for category in file_paths:
+    df_category = groups.get(category, df_cleaned.iloc[:0]).droplevel("category")
+
+    cleaned_dfs[category] = df_category
+    valid_counts[category] = len(df_category)
+
     # Save cleaned version
     cleaned_path = f"data/processed_data/{category}_data_cleaned.csv"
-    df_cleaned.to_csv(cleaned_path, index=False)
+    df_category.to_csv(cleaned_path, index=False, chunksize=50000)
 
 valid_counts
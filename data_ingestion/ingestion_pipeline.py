@@ -1,19 +1,46 @@
 import os
 import sys
+import math
 import faiss
+import hashlib
+import sqlite3
 import numpy as np
 import pandas as pd
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
-from typing import List
+from typing import List, Tuple
 from dotenv import load_dotenv
+from concurrent.futures import ThreadPoolExecutor
 from utils.model_loader import ModelLoader
 from utils.config_loader import load_config
+from retriever.category import detect_category_from_query
+from utils.faiss_store import save_faiss_store, load_faiss_store, set_search_params, category_id_map, filtered_search_params, search_vectors
 from langchain_core.documents import Document
 from langchain_community.vectorstores import FAISS
-from langchain.text_splitter import RecursiveCharacterTextSplitter
+from langchain_community.vectorstores.utils import DistanceStrategy
 from langchain_community.docstore.in_memory import InMemoryDocstore
 
 
+def _batched(items, n):
+    for i in range(0, len(items), n):
+        yield items[i:i + n]
+
+
+# Rows converted to float32 at a time when adding to FAISS, bounding peak RAM
+ADD_CHUNK_ROWS = 65536
+
+# Reviews longer than CHUNK_SIZE characters are cut into overlapping windows
+CHUNK_SIZE = 512
+CHUNK_OVERLAP = 50
+
+
+def _chunk_text(text: str) -> List[str]:
+    # Stop once a window reaches the end, so no tail fragment already covered by the previous window
+    return [text[i:i + CHUNK_SIZE] for i in range(0, max(len(text) - CHUNK_OVERLAP, 1), CHUNK_SIZE - CHUNK_OVERLAP)]
+
+
+def _text_key(text: str) -> str:
+    return hashlib.blake2b(text.encode("utf-8"), digest_size=16).hexdigest()
+
 
 class DataIngestion:
     def __init__(self):
@@ -55,13 +82,14 @@ class DataIngestion:
     def _load_csv(self):
         dfs = []
         for path in self.csv_path:  # Use self.csv_path instead of calling _get_csv_paths again
-            df = pd.read_csv(path)
+            df = pd.read_csv(path, engine="pyarrow", dtype_backend="pyarrow")
             expected_columns = {'Title', 'Rating', 'Price', 'Reviews'}
             if not expected_columns.issubset(set(df.columns)):
                 raise ValueError(f"CSV at {path} must contain columns: {expected_columns}")
 
-            # Just use the file name without "_data.csv" to determine the category
-            category = os.path.basename(path).replace("_data.csv", "")
+            # The file name without "_data_cleaned.csv" is the category, e.g. "mobiles",
+            # matching what detect_category_from_query returns
+            category = os.path.basename(path).replace("_data_cleaned.csv", "")
             df["category"] = category
             dfs.append(df)
 
@@ -74,34 +102,34 @@ class DataIngestion:
         documents = []
         clean_data = self.product_data.dropna(subset=["Reviews"])
 
-        text_splitter = RecursiveCharacterTextSplitter(
-            chunk_size=512,
-            chunk_overlap=50,
-            length_function=len,
-            separators=[";",]
+        # One row per individual review: split, explode and strip in vectorized passes
+        reviews = clean_data.assign(review=clean_data["Reviews"].str.split(";")).explode("review")
+        reviews["review"] = reviews["review"].str.strip()
+        reviews = reviews[reviews["review"].str.len() > 0]
+
+        n = len(reviews)
+        columns = zip(
+            reviews["review"],
+            reviews["review"].str.len() > CHUNK_SIZE,
+            reviews["Title"],
+            reviews["Rating"],
+            reviews["Price"],
+            reviews["URL"] if "URL" in reviews else [""] * n,
+            reviews["category"],
         )
-
-        for _, row in clean_data.iterrows():
-            review_texts = str(row["Reviews"]).split(";")  # Split multiple reviews
+        for review, is_long, title, rating, price, url, category in columns:
             metadata = {
-                "product_name": row["Title"],
-                "product_rating": row["Rating"],
-                "product_price": row["Price"],
-                "product_url": row.get("URL", ""),
-                "category": row.get("Category", "unknown")
+                "product_name": title,
+                "product_rating": rating,
+                "product_price": price,
+                "product_url": url,
+                "category": category
             }
-
-            for single_review in review_texts:
-                single_review = single_review.strip()
-                if not single_review:
-                    continue
-
-                if len(single_review) > 512:
-                    chunks = text_splitter.split_text(single_review)
-                    for chunk in chunks:
-                        documents.append(Document(page_content=chunk.strip(), metadata=metadata))
-                else:
-                    documents.append(Document(page_content=single_review, metadata=metadata))
+            if is_long:
+                chunks = _chunk_text(review)
+                documents.extend(Document(page_content=chunk.strip(), metadata=metadata) for chunk in chunks)
+            else:
+                documents.append(Document(page_content=review, metadata=metadata))
 
         print(f"Transformed {len(documents)} documents.")
         print(f'documet : {documents[0]}')
@@ -112,35 +140,118 @@ class DataIngestion:
 
 
 
+    def _embed_texts(self, embeddings, texts: List[str]) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Embed texts through an on-disk cache keyed by a hash of each text, so reruns
+        only embed new or changed reviews. Missing texts are embedded in fixed-size
+        batches on a thread pool and written to the cache as each batch completes.
+        Vectors are stored and returned as float16, half the disk and RAM of float32.
+
+        Identical texts share a key and are embedded once. Returns the matrix of unique
+        vectors plus, for every input text, the index of its row in that matrix.
+        """
+        ingestion_config = self.config.get("ingestion", {})
+        batch_size = ingestion_config.get("embedding_batch_size", 128)
+        max_workers = ingestion_config.get("embedding_workers", 8)
+        cache_path = ingestion_config.get("embedding_cache_path", "embedding_cache.sqlite")
+
+        keys = [_text_key(text) for text in texts]
+        unique_keys, first_seen, inverse = np.unique(keys, return_index=True, return_inverse=True)
+        unique_keys = unique_keys.tolist()
+        conn = sqlite3.connect(cache_path)
+        try:
+            conn.execute("CREATE TABLE IF NOT EXISTS embeddings_fp16 (hash TEXT PRIMARY KEY, vec BLOB)")
+            vectors = {}
+            for key_batch in _batched(unique_keys, 900):  # stay under SQLite's bound-parameter limit
+                placeholders = ",".join("?" * len(key_batch))
+                rows = conn.execute(f"SELECT hash, vec FROM embeddings_fp16 WHERE hash IN ({placeholders})", key_batch)
+                vectors.update((key, np.frombuffer(vec, dtype=np.float16)) for key, vec in rows)
+
+            missing = [(key, texts[i]) for key, i in zip(unique_keys, first_seen) if key not in vectors]
+            print(f"[INFO] {len(unique_keys)} unique of {len(texts)} texts: "
+                  f"{len(unique_keys) - len(missing)} embeddings cached, {len(missing)} to generate")
+
+            missing_batches = list(_batched(missing, batch_size))
+            with ThreadPoolExecutor(max_workers=max_workers) as executor:
+                embedded = executor.map(embeddings.embed_documents, ([text for _, text in batch] for batch in missing_batches))
+                for batch, batch_vectors in zip(missing_batches, embedded):
+                    rows = [(key, np.asarray(vec, dtype=np.float16)) for (key, _), vec in zip(batch, batch_vectors)]
+                    conn.executemany("INSERT OR REPLACE INTO embeddings_fp16 VALUES (?, ?)", [(key, vec.tobytes()) for key, vec in rows])
+                    conn.commit()
+                    vectors.update(rows)
+        finally:
+            conn.close()
+
+        return np.stack([vectors[key] for key in unique_keys]), inverse
+
+    def _build_index(self, unique_vectors: np.ndarray, inverse: np.ndarray) -> faiss.Index:
+        """
+        Size the index to the corpus: HNSW (8-bit scalar-quantized unless faiss.hnsw_sq8
+        is false) below faiss.hnsw_max_vectors, otherwise IVF+PQ with nlist ~ 4*sqrt(N),
+        unless faiss.index_factory names a layout explicitly.
+        Vectors are L2-normalised and searched by inner product, i.e. cosine
+        similarity; query vectors need no normalisation since it does not change the ranking.
+        Takes the unique float16 vectors from _embed_texts and expands them back to one row
+        per document, at most ADD_CHUNK_ROWS rows at a time, converting each chunk to float32.
+        """
+        faiss_config = self.config.get("faiss", {})
+        n, dim = len(inverse), unique_vectors.shape[1]
+
+        def as_float32(rows):
+            rows = np.ascontiguousarray(rows, dtype=np.float32)
+            faiss.normalize_L2(rows)
+            return rows
+
+        def train_sample(nlist):
+            # k-means gains nothing past ~256 points per centroid, so train on a sample
+            sample = np.random.default_rng(0).choice(n, size=min(n, 256 * nlist), replace=False)
+            return as_float32(unique_vectors[inverse[np.sort(sample)]])
+
+        factory_spec = faiss_config.get("index_factory")
+        if factory_spec:
+            # An explicit factory string, e.g. "IVF4096,PQ64x8", overrides the size-based choice
+            print(f"[INFO] Building FAISS index '{factory_spec}' for {n} vectors...")
+            index = faiss.index_factory(dim, factory_spec, faiss.METRIC_INNER_PRODUCT)
+            ivf = faiss.try_extract_index_ivf(index)
+            if not index.is_trained:
+                index.train(train_sample(ivf.nlist if ivf is not None else 256))
+            set_search_params(
+                index, nprobe=max(8, ivf.nlist // 32) if ivf is not None else None, ef_search=faiss_config.get("ef_search", 64)
+            )
+        elif n < faiss_config.get("hnsw_max_vectors", 50_000):
+            hnsw_m = faiss_config.get("hnsw_m", 32)
+            if faiss_config.get("hnsw_sq8", True):
+                # 8-bit scalar-quantized storage: a quarter of the bytes per vector, so the
+                # graph walk moves less memory; only needs a per-dimension range from training
+                print(f"[INFO] Building FAISS HNSW index with SQ8 storage for {n} vectors...")
+                index = faiss.IndexHNSWSQ(dim, faiss.ScalarQuantizer.QT_8bit, hnsw_m, faiss.METRIC_INNER_PRODUCT)
+            else:
+                print(f"[INFO] Building FAISS HNSW index for {n} vectors...")
+                index = faiss.IndexHNSWFlat(dim, hnsw_m, faiss.METRIC_INNER_PRODUCT)
+            index.hnsw.efConstruction = faiss_config.get("ef_construction", 200)
+            index.hnsw.efSearch = faiss_config.get("ef_search", 64)
+            if not index.is_trained:
+                index.train(train_sample(256))
+        else:
+            nlist = max(64, int(4 * math.sqrt(n)))
+            m = next(m for m in range(min(64, dim // 4), 0, -1) if dim % m == 0)  # PQ needs dim % m == 0
+            index = faiss.IndexIVFPQ(faiss.IndexFlatIP(dim), dim, nlist, m, 8, faiss.METRIC_INNER_PRODUCT)
+            print(f"[INFO] Training FAISS index with quantized IVF+PQ (nlist={nlist}, m={m})...")
+            index.train(train_sample(nlist))
+            index.nprobe = max(8, nlist // 32)
+
+        for start in range(0, n, ADD_CHUNK_ROWS):
+            index.add(as_float32(unique_vectors[inverse[start:start + ADD_CHUNK_ROWS]]))
+        return index
+
     def store_in_vector_db(self, documents: List[Document]):
         embeddings = self.model_loader.load_embeddings()
         print("[INFO] Converting documents to vectors for FAISS training...")
 
         texts = [doc.page_content for doc in documents]
+        unique_vectors, inverse = self._embed_texts(embeddings, texts)
 
-        # Cache file path
-        cache_file = "cached_embeddings.npy"
-
-        # Check if cached file exists
-        if os.path.exists(cache_file):
-            print("[INFO] Loading cached embeddings...")
-            vectors_np = np.load(cache_file)
-        else:
-            print("[INFO] Generating new embeddings...")
-            vectors = embeddings.embed_documents(texts)
-            vectors_np = np.array(vectors).astype("float32")
-            np.save(cache_file, vectors_np)
-            print("[INFO] Embeddings cached to:", cache_file)
-
-        dim = vectors_np.shape[1]
-        quantizer = faiss.IndexFlatL2(dim)
-        index = faiss.IndexIVFPQ(quantizer, dim, 40, 8, 8)
-
-        if not index.is_trained:
-            print("[INFO] Training FAISS index with quantized IVF+PQ...")
-            index.train(vectors_np)
-
-        index.add(vectors_np)
+        index = self._build_index(unique_vectors, inverse)
 
         docstore = InMemoryDocstore({str(i): doc for i, doc in enumerate(documents)})
         index_to_docstore_id = {i: str(i) for i in range(len(documents))}
@@ -149,16 +260,17 @@ class DataIngestion:
             embedding_function=embeddings,
             index=index,
             docstore=docstore,
-            index_to_docstore_id=index_to_docstore_id
+            index_to_docstore_id=index_to_docstore_id,
+            distance_strategy=DistanceStrategy.MAX_INNER_PRODUCT
         )
 
-        vstore.save_local(self.faiss_index_path)
+        save_faiss_store(vstore, self.faiss_index_path)
         print(f"[INFO] Successfully saved {len(documents)} documents to FAISS index.")
         return vstore
 
     def load_faiss_index(self):
         embeddings = self.model_loader.load_embeddings()
-        vstore = FAISS.load_local(self.faiss_index_path, embeddings, allow_dangerous_deserialization=True)
+        vstore = load_faiss_store(self.faiss_index_path, embeddings, mmap=self.config.get("faiss", {}).get("mmap", True))
         return vstore
 
     def log_review_statistics(self):
@@ -167,7 +279,7 @@ class DataIngestion:
         print(self.product_data['category'].value_counts(), end="\n\n")
 
         clean_data = self.product_data.dropna(subset=["Reviews"])
-        clean_data = clean_data[clean_data["Reviews"].str.strip().astype(bool)]  # Remove empty strings
+        clean_data = clean_data[clean_data["Reviews"].str.strip().str.len() > 0]  # Remove empty strings
 
         print("Rows with valid (non-empty) reviews per category:")
         print(clean_data['category'].value_counts(), end="\n\n")
@@ -175,25 +287,13 @@ class DataIngestion:
         total_valid_reviews = 0
         for category in clean_data['category'].unique():
             cat_df = clean_data[clean_data['category'] == category]
-            review_count = cat_df['Reviews'].apply(lambda x: len(str(x).split(';'))).sum()
+            review_count = (cat_df['Reviews'].str.count(';') + 1).sum()
             print(f"Estimated review count for '{category}': {review_count}")
             total_valid_reviews += review_count
 
         print(f"\nTotal estimated individual reviews across all categories: {total_valid_reviews}")
         print("[INFO] ===================================\n")
 
-def detect_category_from_query(query: str) -> str:
-        query = query.lower()
-        if "headphone" in query or "earphone" in query or "headset" in query:
-            return "headphones"
-        elif "mobile" in query or "smartphone" in query or "phone" in query:
-            return "mobiles"
-        elif "watch" in query:
-            return "smart_watches"
-        elif "tv" in query or "television" in query:
-            return "tv"
-        else:
-            return "unknown"
         
 if __name__ == "__main__":
     ingestion = DataIngestion()
@@ -209,19 +309,18 @@ if __name__ == "__main__":
 
     print(f"[INFO] Detected category from query: {detected_category}")
 
-    results = vstore.similarity_search(query, k=top_k)
-
-    if detected_category == "unknown":
+    category_ids = category_id_map(vstore)
+    if detected_category not in category_ids:
         print("⚠️ Could not determine product category from the query. Showing top results without category filter.")
-        for idx, res in enumerate(results, 1):
-            print(f"Result {idx}: {res.page_content}\nMetadata: {res.metadata}\n")
+        params = None
     else:
-        filtered_results = [res for res in results if res.metadata.get("category") == detected_category]
-        if not filtered_results:
-            print(f"⚠️ No relevant documents found for category '{detected_category}'. Try rephrasing your query.")
-        else:
-            for idx, res in enumerate(filtered_results, 1):
-                print(f"Result {idx}: {res.page_content}\nMetadata: {res.metadata}\n")
+        # Only the detected category's vectors are scanned
+        params = filtered_search_params(vstore.index, category_ids[detected_category])
+
+    query_vector = np.asarray([vstore.embedding_function.embed_query(query)], dtype=np.float32)
+    results = search_vectors(vstore, query_vector, top_k, params=params)[0]
+    for idx, res in enumerate(results, 1):
+        print(f"Result {idx}: {res.page_content}\nMetadata: {res.metadata}\n")
 
 '''if __name__ == "__main__":
     ingestion = DataIngestion()
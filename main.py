@@ -1,12 +1,15 @@
+import os
+import asyncio
 import uvicorn
+from contextlib import asynccontextmanager
 from dotenv import load_dotenv
 from fastapi import FastAPI, Request, Form
-from fastapi.responses import HTMLResponse
+from fastapi.responses import HTMLResponse, ORJSONResponse, StreamingResponse
 from fastapi.staticfiles import StaticFiles
 from fastapi.templating import Jinja2Templates
 from fastapi.middleware.cors import CORSMiddleware
 import logging
-from langchain_core.runnables import RunnablePassthrough
+from langchain_core.runnables import RunnableLambda, RunnablePassthrough
 from langchain_core.output_parsers import StrOutputParser
 from langchain_core.prompts import ChatPromptTemplate
 from retriever.retrieval import Retriever
@@ -21,7 +24,25 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
-app = FastAPI()
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    Load the FAISS index and run one retrieval before serving, so the first user
+    does not pay for the index load, the embedding client setup and cold index pages.
+    """
+    await asyncio.to_thread(retriever_obj.load_retriever)
+    try:
+        await retriever_obj.acall_retriever("warmup")
+        logger.info("Retriever warmed up")
+    except Exception as e:
+        logger.warning(f"Retriever warmup failed: {str(e)}")
+    yield
+    if retriever_obj.batcher is not None:
+        await retriever_obj.batcher.stop()
+    if retriever_obj.shared_cache is not None:
+        await retriever_obj.shared_cache.close()
+
+app = FastAPI(lifespan=lifespan, default_response_class=ORJSONResponse)
 app.mount("/static", StaticFiles(directory="static"), name="static")
 templates = Jinja2Templates(directory="templates")
 
@@ -39,43 +60,79 @@ load_dotenv()
 retriever_obj = Retriever() 
 model_loader = ModelLoader() 
 
-def invoke_chain(query: str): 
+FALLBACK_CONTEXT = "No relevant documents found. Responding based on general knowledge."
+
+ERROR_MESSAGE = "I'm sorry, an error occurred while processing your request. Please try again or rephrase your query."
+
+def format_docs(docs) -> str:
+    logger.info(f"Retrieved {len(docs)} documents")
+    return "\n".join(doc.page_content for doc in docs)
+
+def retrieve_context(query: str) -> str:
+    try:
+        return format_docs(retriever_obj.call_retriever(query))
+    except Exception as e:
+        return fallback_context(e)
+
+async def aretrieve_context(query: str) -> str:
+    try:
+        return format_docs(await retriever_obj.acall_retriever(query))
+    except Exception as e:
+        return fallback_context(e)
+
+def fallback_context(error: Exception) -> str:
+    logger.error(f"Error retrieving documents: {str(error)}")
+    # Fallback: Use LLM without retrieved documents
+    logger.info("Falling back to LLM without context")
+    return FALLBACK_CONTEXT
+
+# Built once at startup; per request only the chain invocation runs.
+# The index itself is loaded in lifespan, once the event loop is running.
+# Retrieval runs inside the chain, so invoke, ainvoke and astream all share one pipeline
+PROMPT = ChatPromptTemplate.from_template(PROMPT_TEMPLATES["product_bot"])
+LLM = model_loader.load_llm()
+CHAIN = (
+    {"context": RunnableLambda(retrieve_context, afunc=aretrieve_context), "question": RunnablePassthrough()}
+    | PROMPT
+    | LLM
+    | StrOutputParser()
+)
+
+async def ainvoke_chain(query: str): 
     """
     Invoke the LangChain pipeline with error handling and fallback.
+    Retrieval goes through the query batcher and the LLM call is awaited,
+    so concurrent requests overlap instead of blocking the event loop.
     """
-    retriever = retriever_obj.load_retriever()
-    prompt = ChatPromptTemplate.from_template(PROMPT_TEMPLATES["product_bot"])
-    llm = model_loader.load_llm()
-
     logger.info(f"Processing query: {query}")
-    
-    # Try to retrieve documents
-    context = ""
-    try:
-        retrieved_docs = retriever.invoke(query)
-        logger.info(f"Retrieved {len(retrieved_docs)} documents")
-        context = "\n".join([doc.page_content for doc in retrieved_docs])
-    except Exception as e:
-        logger.error(f"Error retrieving documents: {str(e)}")
-        # Fallback: Use LLM without retrieved documents
-        logger.info("Falling back to LLM without context")
-        context = "No relevant documents found. Responding based on general knowledge."
-
-    # Define the chain with or without context
-    chain = (
-        {"context": lambda _: context, "question": RunnablePassthrough()}
-        | prompt 
-        | llm 
-        | StrOutputParser() 
-    ) 
 
     try:
-        output = chain.invoke(query)
+        output = await CHAIN.ainvoke(query)
         logger.info(f"Generated response: {output}")
         return output
     except Exception as e:
         logger.error(f"Error in chain invocation: {str(e)}")
-        return "I'm sorry, an error occurred while processing your request. Please try again or rephrase your query."
+        return ERROR_MESSAGE
+
+def sse_event(text: str) -> str:
+    # A newline inside a data field would end it early, so each line gets its own data: field
+    return "".join(f"data: {line}\n" for line in text.split("\n")) + "\n"
+
+async def astream_chain(query: str):
+    """
+    Yield the answer as Server-Sent Events while the LLM generates it,
+    instead of waiting for the full response.
+    """
+    logger.info(f"Processing streamed query: {query}")
+
+    try:
+        async for chunk in CHAIN.astream(query):
+            if chunk:
+                yield sse_event(chunk)
+    except Exception as e:
+        logger.error(f"Error in chain streaming: {str(e)}")
+        yield sse_event(ERROR_MESSAGE)
+    yield "event: done\ndata: \n\n"
 
 @app.get("/", response_class=HTMLResponse)
 async def index(request: Request):
@@ -86,8 +143,26 @@ async def index(request: Request):
 
 @app.post("/get", response_class=HTMLResponse)
 async def chat(msg: str = Form(...)):
-    result = invoke_chain(msg)
+    result = await ainvoke_chain(msg)
     return result
 
+@app.post("/get_stream")
+async def chat_stream(msg: str = Form(...)):
+    return StreamingResponse(
+        astream_chain(msg),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
 if __name__ == "__main__":
-    uvicorn.run(app, host="0.0.0.0", port=8000)
\ No newline at end of file
+    # Workers need the app as an import string; they share the mmapped vector data,
+    # but each loads its own docstore (and HNSW graph links) onto its heap
+    uvicorn.run(
+        "main:app",
+        host="0.0.0.0",
+        port=8000,
+        workers=int(os.getenv("WEB_CONCURRENCY", os.cpu_count() or 1)),
+        # uvicorn picks uvloop/httptools when installed; uvloop has no Windows build
+        loop="auto",
+        http="auto"
+    )
\ No newline at end of file
@@ -9,5 +9,11 @@ PROMPT_TEMPLATES = {
     QUESTION: {question}
 
     YOUR ANSWER:
-    """
+    """,
+    "rerank_score": """Rate the relevance of the following review to the query "{query}" on a scale of 1 to 10.
+    Review: {review}
+    Respond with only the number.""",
+    "rerank_listwise": """Rank the following reviews by relevance to the query "{query}".
+    {passages}
+    Output only the IDs in order of relevance, e.g. [3] > [1] > [2]."""
 }
\ No newline at end of file
@@ -0,0 +1,70 @@
+import asyncio
+from typing import Callable, List, Union
+
+from langchain_core.documents import Document
+
+
+class QueryBatcher:
+    """
+    Coalesces retrieval requests that arrive within a short window into one
+    call of search_fn, which embeds and searches the whole batch at once.
+    """
+
+    def __init__(self, search_fn: Callable[[List[str]], List[Union[List[Document], Exception]]], max_batch: int = 32, max_wait: float = 0.01):
+        self.search_fn = search_fn
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self._queue = asyncio.Queue()
+        self._task = None
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def submit(self, query: str) -> List[Document]:
+        self.start()
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((query, future))
+        return await future
+
+    async def _collect(self):
+        batch = [await self._queue.get()]
+        deadline = asyncio.get_running_loop().time() + self.max_wait
+        while len(batch) < self.max_batch:
+            remaining = deadline - asyncio.get_running_loop().time()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), remaining))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    async def _run(self) -> None:
+        while True:
+            batch = await self._collect()
+            queries = [query for query, _ in batch]
+            try:
+                results = await asyncio.to_thread(self.search_fn, queries)
+            except Exception as e:
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+            for (_, future), docs in zip(batch, results):
+                if future.done():
+                    continue
+                # search_fn reports a failure for just some queries by returning the exception in their slot
+                if isinstance(docs, Exception):
+                    future.set_exception(docs)
+                else:
+                    future.set_result(docs)
@@ -0,0 +1,24 @@
+import re
+
+# Query keywords per product category. Categories match the processed CSV names,
+# and within a category longer keywords come first so they win the alternation
+CATEGORY_KEYWORDS = {
+    "headphones": ("headphone", "earphone", "headset"),
+    "mobiles": ("smartphone", "mobile", "phone"),
+    "smart_watches": ("smartwatch", "watch"),
+    "tv": ("television", "tv"),
+}
+
+# Named groups are the categories; one scan of the query finds the first keyword mentioned
+_CAT_RE = re.compile(
+    "|".join(
+        f"(?P<{category}>{'|'.join(map(re.escape, keywords))})"
+        for category, keywords in CATEGORY_KEYWORDS.items()
+    ),
+    re.IGNORECASE
+)
+
+
+def detect_category_from_query(query: str) -> str:
+    m = _CAT_RE.search(query)
+    return m.lastgroup if m else "unknown"
@@ -0,0 +1,70 @@
+import re
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import List
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+_WHITESPACE_RE = re.compile(r"\s+")
+
+
+class EmbeddingCache(Embeddings):
+    """
+    Wraps an embedding model with an in-process LRU of query vectors, keyed by the
+    query lowercased with whitespace collapsed, so repeated queries skip the model.
+    Document embedding is passed straight through.
+    """
+
+    def __init__(self, embeddings: Embeddings, max_size: int = 5000):
+        self.embeddings = embeddings
+        self.max_size = max_size
+        self._data = OrderedDict()
+        self._lock = threading.RLock()
+
+    @staticmethod
+    def _key(text: str) -> str:
+        normalized = _WHITESPACE_RE.sub(" ", text).strip().lower()
+        return hashlib.blake2b(normalized.encode()).hexdigest()
+
+    def _get(self, key: str):
+        with self._lock:
+            vector = self._data.get(key)
+            if vector is not None:
+                self._data.move_to_end(key)
+            return vector
+
+    def _put(self, key: str, vector: np.ndarray) -> None:
+        with self._lock:
+            self._data[key] = vector
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+
+    def embed_query(self, text: str) -> List[float]:
+        key = self._key(text)
+        vector = self._get(key)
+        if vector is None:
+            vector = np.asarray(self.embeddings.embed_query(text), dtype=np.float32)
+            self._put(key, vector)
+        return vector.tolist()
+
+    def embed_queries(self, texts: List[str]) -> np.ndarray:
+        """
+        Embed a batch of queries as a float32 matrix, sending only the cache misses
+        to the model in one call.
+        """
+        keys = [self._key(text) for text in texts]
+        vectors = [self._get(key) for key in keys]
+        missing = [i for i, vector in enumerate(vectors) if vector is None]
+        if missing:
+            # Query-side task type, as embed_query would use, but for the whole batch in one request
+            embedded = self.embeddings.embed_documents([texts[i] for i in missing], task_type="RETRIEVAL_QUERY")
+            for i, vec in zip(missing, embedded):
+                vectors[i] = np.asarray(vec, dtype=np.float32)
+                self._put(keys[i], vectors[i])
+        return np.stack(vectors)
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self.embeddings.embed_documents(texts)
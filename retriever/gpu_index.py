@@ -0,0 +1,83 @@
+from typing import Any, List, Optional
+
+import faiss
+import numpy as np
+from langchain_core.documents import Document
+from langchain_core.vectorstores import VectorStore
+from langchain_community.vectorstores import FAISS
+from langchain_community.vectorstores.utils import DistanceStrategy
+
+try:
+    import cupy as cp
+    from cuvs.neighbors import cagra
+except ImportError:  # cuVS is optional; without it retrieval stays on CPU FAISS
+    cp = None
+    cagra = None
+
+
+def gpu_available() -> bool:
+    if cp is None:
+        return False
+    try:
+        return cp.cuda.runtime.getDeviceCount() > 0
+    except Exception:
+        return False
+
+
+class CagraVectorStore(VectorStore):
+    """
+    Read-only vector store that searches a cuVS CAGRA graph on the GPU, built from the
+    vectors of an existing FAISS store and sharing its docstore. Meant for batched,
+    unfiltered searches; category-filtered queries stay on the CPU index.
+    """
+
+    def __init__(self, vstore: FAISS, graph_degree: int = 64, itopk_size: int = 64):
+        self.vstore = vstore
+        self.embedding_function = vstore.embedding_function
+        # Stored vectors are L2-normalised, so squared-L2 order equals the inner-product order
+        self.index = cagra.build(
+            cagra.IndexParams(metric="sqeuclidean", graph_degree=graph_degree),
+            cp.asarray(self._reconstruct_all(vstore.index))
+        )
+        self.search_params = cagra.SearchParams(itopk_size=itopk_size)
+
+    @staticmethod
+    def _reconstruct_all(index: faiss.Index) -> np.ndarray:
+        # Decoded from the CPU index's codes, so PQ/SQ8 indexes give their approximated vectors
+        ivf = faiss.try_extract_index_ivf(index)
+        if ivf is not None:
+            ivf.make_direct_map()
+        return np.ascontiguousarray(index.reconstruct_n(0, index.ntotal), dtype=np.float32)
+
+    @property
+    def embeddings(self):
+        return self.embedding_function
+
+    def search_vectors(self, vectors: np.ndarray, k: int) -> List[List[Document]]:
+        """
+        One CAGRA search over a float32 query matrix, one document list per query row.
+        """
+        _, neighbors = cagra.search(
+            self.search_params, self.index, cp.asarray(vectors, dtype=cp.float32), k
+        )
+        ids = cp.asnumpy(cp.asarray(neighbors)).astype(np.int64)
+        lookup = self.vstore.index_to_docstore_id
+        return [
+            [self.vstore.docstore.search(lookup[i]) for i in row if i in lookup]
+            for row in ids
+        ]
+
+    def similarity_search_by_vector(self, embedding: List[float], k: int = 4, **kwargs: Any) -> List[Document]:
+        return self.search_vectors(np.asarray([embedding], dtype=np.float32), k)[0]
+
+    def similarity_search(self, query: str, k: int = 4, **kwargs: Any) -> List[Document]:
+        return self.similarity_search_by_vector(self.embedding_function.embed_query(query), k)
+
+    @classmethod
+    def from_texts(cls, texts: List[str], embedding, metadatas: Optional[List[dict]] = None, **kwargs: Any):
+        # Normalised vectors, as the ingestion pipeline stores them, so squared-L2 ranks like cosine
+        vstore = FAISS.from_texts(
+            texts, embedding, metadatas=metadatas,
+            normalize_L2=True, distance_strategy=DistanceStrategy.MAX_INNER_PRODUCT
+        )
+        return cls(vstore, **kwargs)
@@ -0,0 +1,165 @@
+import time
+import asyncio
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from typing import List, Optional
+
+import orjson
+from langchain_core.documents import Document
+
+try:
+    import redis.asyncio as aioredis
+except ImportError:  # Redis is optional; without it only the in-process tier is used
+    aioredis = None
+
+logger = logging.getLogger(__name__)
+
+
+class QueryCache:
+    """
+    Thread-safe LRU cache with a TTL for retrieval results, keyed by the normalized query.
+    Serves as the in-process first tier in front of SharedQueryCache.
+    """
+
+    def __init__(self, max_size: int = 2000, ttl: float = 300):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = threading.RLock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @staticmethod
+    def _key(query: str) -> str:
+        return hashlib.blake2b(query.strip().lower().encode()).hexdigest()
+
+    def get(self, query: str):
+        key = self._key(query)
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None or time.monotonic() - entry[0] > self.ttl:
+                if entry is not None:
+                    del self._data[key]
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, query: str, value) -> None:
+        key = self._key(query)
+        with self._lock:
+            self._data[key] = (time.monotonic(), value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "size": len(self._data),
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
+
+
+class SharedQueryCache:
+    """
+    Redis-backed second tier for retrieval results, shared by all uvicorn workers.
+    Documents are stored as orjson-encoded content/metadata pairs with a TTL.
+    Redis errors are logged and treated as misses so retrieval never depends on Redis:
+    calls time out after `timeout` seconds without retries, and after a failure Redis
+    is skipped for `cooldown` seconds. Writes run in the background.
+    """
+
+    def __init__(self, url: str, ttl: int = 300, prefix: str = "rag:q:", timeout: float = 0.05, cooldown: float = 30):
+        self.url = url
+        self.ttl = ttl
+        self.prefix = prefix
+        self.timeout = timeout
+        self.cooldown = cooldown
+        self._client = None
+        self._down_until = 0.0
+        self._pending = set()
+
+    @property
+    def client(self):
+        # Created on first use so the connection pool belongs to the serving event loop
+        if self._client is None:
+            self._client = aioredis.Redis.from_url(
+                self.url,
+                socket_connect_timeout=self.timeout,
+                socket_timeout=self.timeout,
+                retry=None
+            )
+        return self._client
+
+    def _key(self, query: str) -> str:
+        return self.prefix + QueryCache._key(query)
+
+    def _available(self) -> bool:
+        return time.monotonic() >= self._down_until
+
+    def _mark_down(self) -> None:
+        self._down_until = time.monotonic() + self.cooldown
+
+    async def get(self, query: str) -> Optional[List[Document]]:
+        if not self._available():
+            return None
+        try:
+            raw = await self.client.get(self._key(query))
+        except Exception as e:
+            logger.warning(f"Redis cache read failed, skipping Redis for {self.cooldown}s: {str(e)}")
+            self._mark_down()
+            return None
+        if raw is None:
+            return None
+        return [Document(page_content=item["content"], metadata=item["metadata"]) for item in orjson.loads(raw)]
+
+    async def put(self, query: str, docs: List[Document]) -> None:
+        if not self._available():
+            return
+        payload = orjson.dumps(
+            [{"content": doc.page_content, "metadata": doc.metadata} for doc in docs],
+            option=orjson.OPT_SERIALIZE_NUMPY,
+            default=str
+        )
+        try:
+            await self.client.set(self._key(query), payload, ex=self.ttl)
+        except Exception as e:
+            logger.warning(f"Redis cache write failed, skipping Redis for {self.cooldown}s: {str(e)}")
+            self._mark_down()
+
+    def put_background(self, query: str, docs: List[Document]) -> None:
+        """
+        Schedule put on the running loop so the write stays off the response path.
+        """
+        task = asyncio.create_task(self.put(query, docs))
+        # Keep a reference until done, as the loop only holds tasks weakly
+        self._pending.add(task)
+        task.add_done_callback(self._pending.discard)
+
+    async def close(self) -> None:
+        if self._pending:
+            await asyncio.gather(*self._pending, return_exceptions=True)
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+
+def create_shared_cache(url: Optional[str], ttl: int = 300, timeout: float = 0.05) -> Optional[SharedQueryCache]:
+    if not url:
+        return None
+    if aioredis is None:
+        logger.warning("redis_url is set but the redis package is not installed; using the in-process cache only")
+        return None
+    return SharedQueryCache(url, ttl, timeout=timeout)
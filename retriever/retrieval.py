@@ -1,15 +1,34 @@
 import os
+import re
 import sys
-from typing import List
+import heapq
+from typing import List, Union
 
 from dotenv import load_dotenv
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 from utils.model_loader import ModelLoader
 from utils.config_loader import load_config
+from utils.faiss_store import load_faiss_store, set_search_params, category_id_map, filtered_search_params, search_vectors
+from retriever.query_cache import QueryCache, create_shared_cache
+from retriever.batcher import QueryBatcher
+from retriever.embedding_cache import EmbeddingCache
+from retriever.category import detect_category_from_query
+from retriever.gpu_index import CagraVectorStore, gpu_available
 from langchain_core.documents import Document
-from langchain_community.vectorstores import FAISS
+from prompt_library.prompt import PROMPT_TEMPLATES
 
 
+# Rerank prompts are plain str.format templates; no template parsing per call
+_SCORE_PROMPT = PROMPT_TEMPLATES["rerank_score"]
+_LISTWISE_PROMPT = PROMPT_TEMPLATES["rerank_listwise"]
+
+# First standalone 1-10 in the reply, so "Score: 7." or "7/10" still parse
+_SCORE_RE = re.compile(r"\b(10|[1-9])\b")
+
+def _parse_score(text: str) -> int:
+    m = _SCORE_RE.search(text)
+    return int(m.group(1)) if m else 5
+
 
 class Retriever:
     def __init__(self):
@@ -18,7 +37,21 @@ class Retriever:
         self._load_env_variables()
         self.vstore = None
         self.retriever = None
+        self.batcher = None
+        self.category_params = {}
+        self.gpu_store = None
         self.faiss_index_path = os.path.abspath(os.getenv("FAISS_INDEX_PATH", "faiss_index"))
+        retriever_config = self.config.get("retriever", {})
+        self.query_cache = QueryCache(
+            max_size=retriever_config.get("cache_size", 2000),
+            ttl=retriever_config.get("cache_ttl", 300)
+        )
+        # Shared across workers when a Redis URL is configured, otherwise None
+        self.shared_cache = create_shared_cache(
+            retriever_config.get("redis_url") or os.getenv("REDIS_URL"),
+            ttl=retriever_config.get("cache_ttl", 300),
+            timeout=retriever_config.get("redis_timeout_ms", 50) / 1000
+        )
 
 
     def _load_env_variables(self):
@@ -30,59 +63,253 @@ class Retriever:
 
     def load_retriever(self):
         if not self.vstore:
-            embeddings = self.model_loader.load_embeddings()
-            self.vstore = FAISS.load_local(self.faiss_index_path, embeddings, allow_dangerous_deserialization=True)
+            embeddings = EmbeddingCache(
+                self.model_loader.load_embeddings(),
+                max_size=self.config.get("retriever", {}).get("embedding_cache_size", 5000)
+            )
+            self.vstore = load_faiss_store(
+                self.faiss_index_path, embeddings, mmap=self.config.get("faiss", {}).get("mmap", True)
+            )
+            retriever_config = self.config.get("retriever", {})
+            # The index keeps the nprobe/efSearch it was built with; only explicit overrides apply
+            set_search_params(
+                self.vstore.index,
+                nprobe=retriever_config.get("nprobe"),
+                ef_search=retriever_config.get("ef_search")
+            )
+            # One ID selector per category, built once so filtered searches only pay for the lookup
+            self.category_params = {
+                category: filtered_search_params(self.vstore.index, ids)
+                for category, ids in category_id_map(self.vstore).items()
+            }
+            self.gpu_store = self._load_gpu_store()
+            # Results cached against a previous index are stale once a new one is loaded
+            self.query_cache.clear()
+            self.retriever = None
+            self.batcher = None
             print("FAISS index loaded successfully.")
 
         if not self.retriever:
-            top_k = self.config.get("retriever", {}).get("top_k", 50)
-            self.retriever = self.vstore.as_retriever(search_kwargs={"k": top_k})
+            self.retriever = self.vstore.as_retriever(search_kwargs={"k": self._top_k()})
             print("Retriever initialized successfully.")
 
         return self.retriever
 
-    def rerank_documents(self, query: str, docs: List[Document], llm) -> List[Document]:
+    def _load_gpu_store(self):
         """
-        Re-rank retrieved documents based on relevance to the query using the LLM.
+        Mirror the loaded index into a cuVS CAGRA graph when retriever.gpu_cagra is set
+        and a CUDA device is present; returns None otherwise, leaving search on CPU FAISS.
         """
-        scored_docs = []
+        retriever_config = self.config.get("retriever", {})
+        if not retriever_config.get("gpu_cagra", False):
+            return None
+        if not gpu_available():
+            print("[WARN] retriever.gpu_cagra is set but cuVS/CUDA is unavailable; searching on CPU.")
+            return None
+        gpu_store = CagraVectorStore(
+            self.vstore,
+            graph_degree=retriever_config.get("cagra_graph_degree", 64),
+            itopk_size=retriever_config.get("cagra_itopk_size", 64)
+        )
+        print("CAGRA GPU index built successfully.")
+        return gpu_store
+
+    def _top_k(self) -> int:
+        # Documents returned on the serving path, which does not rerank
+        return self.config.get("retriever", {}).get("top_k", 10)
+
+    def _first_stage_k(self) -> int:
+        # Candidates fetched for callers that rerank; the reranker prunes them down to rerank_top_k
+        retriever_config = self.config.get("retriever", {})
+        return retriever_config.get("first_stage_k", retriever_config.get("top_k", 20))
+
+    def _rerank_top_k(self, top_k: int = None) -> int:
+        return top_k or self.config.get("retriever", {}).get("rerank_top_k", 10)
+
+    def _score_prompt(self, query: str, doc: Document) -> str:
+        return _SCORE_PROMPT.format(query=query, review=doc.page_content)
+
+    def rerank_documents(self, query: str, docs: List[Document], llm, top_k: int = None) -> List[Document]:
+        """
+        Re-rank retrieved documents based on relevance to the query using the LLM,
+        keeping the top_k best (retriever.rerank_top_k by default).
+        All scoring prompts go out as one llm.batch; documents the LLM could not
+        score get a neutral 5 so they stay in the middle of the ranking.
+        """
+        valid_docs = []
         for i, doc in enumerate(docs):
-            try:
-                if not isinstance(doc, Document):
-                    print(f"[WARN] Skipping non-Document at index {i}")
-                    continue
+            if not isinstance(doc, Document):
+                print(f"[WARN] Skipping non-Document at index {i}")
+                continue
+            valid_docs.append(doc)
+        if not valid_docs:
+            return []
+
+        # The answer is a single number, so stop generating at the end of the first line
+        llm = llm.bind(stop=["\n"])
+        max_workers = self.config.get("retriever", {}).get("rerank_workers", 8)
+        responses = llm.batch(
+            [self._score_prompt(query, doc) for doc in valid_docs],
+            config={"max_concurrency": max_workers},
+            return_exceptions=True
+        )
+
+        scored_docs = []
+        for doc, response in zip(valid_docs, responses):
+            if isinstance(response, Exception):
+                print(f"[WARN] Could not score doc, using neutral score: {response}")
+                scored_docs.append((doc, 5))
+            else:
+                scored_docs.append((doc, _parse_score(response.content)))
+
+        # Only the best top_k are kept, so a bounded heap beats sorting every candidate
+        best = heapq.nlargest(self._rerank_top_k(top_k), scored_docs, key=lambda x: x[1])
+        return [doc for doc, _ in best]
 
-                prompt = f"""Rate the relevance of the following review to the query "{query}" on a scale of 1 to 10.
-                    Review: {doc.page_content}
-                    Respond with only the number."""
+    def _rank_window(self, query: str, docs: List[Document], llm):
+        """
+        Ask the LLM for a relevance ordering of docs in one call. Returns the list of
+        positions in ranked order, or None if no document IDs could be parsed.
+        """
+        passages = "\n".join(f"[{i}] {doc.page_content}" for i, doc in enumerate(docs, 1))
+        prompt = _LISTWISE_PROMPT.format(query=query, passages=passages)
+        response = llm.invoke(prompt).content
+
+        order = []
+        for doc_id in re.findall(r"\[(\d+)\]", response):
+            pos = int(doc_id) - 1
+            if 0 <= pos < len(docs) and pos not in order:
+                order.append(pos)
+        if not order:
+            return None
+        # Anything the LLM left out keeps its original relative order at the end
+        seen = set(order)
+        return order + [pos for pos in range(len(docs)) if pos not in seen]
 
-                score_response = llm.invoke(prompt)
-                score_str = score_response.content.strip()
-                score = int(score_str)
+    def rerank_listwise(self, query: str, docs: List[Document], llm, top_k: int = None) -> List[Document]:
+        """
+        Re-rank documents with listwise LLM calls instead of one scoring call per document.
+        Lists longer than the window are ranked with overlapping windows from the back
+        to the front, so the most relevant documents bubble up to the top.
+        Falls back to pointwise rerank_documents if a ranking cannot be parsed.
+        Returns the top_k best (retriever.rerank_top_k by default).
+        """
+        top_k = self._rerank_top_k(top_k)
+        docs = [doc for doc in docs if isinstance(doc, Document)]
+        if len(docs) < 2:
+            return docs[:top_k]
 
-                scored_docs.append((doc, score))
+        retriever_config = self.config.get("retriever", {})
+        window = retriever_config.get("rerank_window", 20)
+        stride = retriever_config.get("rerank_stride", 10)
+
+        ranked = list(docs)
+        end = len(ranked)
+        try:
+            while True:
+                start = max(0, end - window)
+                order = self._rank_window(query, ranked[start:end], llm)
+                if order is None:
+                    raise ValueError("no document IDs in listwise response")
+                ranked[start:end] = [ranked[start + pos] for pos in order]
+                if start == 0:
+                    break
+                end -= stride
+        except Exception as e:
+            print(f"[WARN] Listwise rerank failed, falling back to pointwise: {e}")
+            return self.rerank_documents(query, docs, llm, top_k=top_k)
+
+        return ranked[:top_k]
+
+    def _search_group(self, vectors, top_k: int, params) -> List[List[Document]]:
+        if params is None and self.gpu_store is not None:
+            return self.gpu_store.search_vectors(vectors, top_k)
+        return search_vectors(self.vstore, vectors, top_k, params=params)
+
+    def search_batch(self, queries: List[str], k: int = None) -> List[Union[List[Document], Exception]]:
+        """
+        Embed and search a batch of queries for k results each (retriever.top_k
+        by default). Queries naming a category are searched
+        only over that category's vectors via an IDSelector, one index.search per
+        category; the rest, and categories with no documents, search the whole index,
+        on the GPU CAGRA graph when one is loaded.
+        A group whose search fails is retried unfiltered on the CPU index; if that also
+        fails, its rows hold the exception so the other groups still get their results.
+        """
+        self.load_retriever()
+        top_k = k or self._top_k()
+        vectors = self.vstore.embedding_function.embed_queries(queries)
+
+        groups = {}
+        for i, query in enumerate(queries):
+            groups.setdefault(detect_category_from_query(query), []).append(i)
+
+        results = [None] * len(queries)
+        for category, rows in groups.items():
+            params = self.category_params.get(category)
+            try:
+                hits = self._search_group(vectors[rows], top_k, params)
             except Exception as e:
-                print(f"[WARN] Skipping doc due to error: {e}")
+                print(f"[WARN] Search for category '{category}' failed, retrying unfiltered on CPU: {e}")
+                try:
+                    hits = search_vectors(self.vstore, vectors[rows], top_k)
+                except Exception as retry_error:
+                    hits = [retry_error] * len(rows)
+            for i, docs in zip(rows, hits):
+                results[i] = docs
+        return results
 
-        scored_docs.sort(key=lambda x: x[1], reverse=True)
-        return [doc for doc, _ in scored_docs]
+    def cached_invoke(self, query: str) -> List[Document]:
+        """
+        Retrieve documents for a query, serving repeated queries from the LRU/TTL cache.
+        """
+        docs = self.query_cache.get(query)
+        if docs is None:
+            docs = self.search_batch([query])[0]
+            if isinstance(docs, Exception):
+                raise docs
+            self.query_cache.put(query, docs)
+        return list(docs)
 
     def call_retriever(self, query: str) -> List[Document]:
-        retriever = self.load_retriever()
-        return retriever.invoke(query)
-
-def detect_category_from_query(query: str) -> str:
-    query = query.lower()
-    if "headphone" in query or "earphone" in query or "headset" in query:
-        return "headphones"
-    elif "mobile" in query or "smartphone" in query or "phone" in query:
-        return "mobiles"
-    elif "watch" in query or 'smartwatch' in query:
-        return "smart_watches"
-    elif "tv" in query or "television" in query:
-        return "tv"
-    else:
-        return "unknown"
+        return self.cached_invoke(query)
+
+    def retrieve_candidates(self, query: str) -> List[Document]:
+        """
+        Fetch retriever.first_stage_k candidates for reranking. Uncached, since the
+        query caches hold top_k results for the serving path.
+        """
+        docs = self.search_batch([query], k=self._first_stage_k())[0]
+        if isinstance(docs, Exception):
+            raise docs
+        return docs
+
+    async def acall_retriever(self, query: str) -> List[Document]:
+        """
+        Async retrieval that checks the in-process cache, then the shared Redis cache
+        if configured, and sends misses through the batcher, so concurrent requests
+        are embedded and searched together.
+        """
+        docs = self.query_cache.get(query)
+        if docs is None and self.shared_cache is not None:
+            docs = await self.shared_cache.get(query)
+            if docs is not None:
+                self.query_cache.put(query, docs)
+        if docs is None:
+            if self.batcher is None:
+                self.load_retriever()
+                retriever_config = self.config.get("retriever", {})
+                self.batcher = QueryBatcher(
+                    self.search_batch,
+                    max_batch=retriever_config.get("batch_size", 32),
+                    max_wait=retriever_config.get("batch_wait_ms", 10) / 1000
+                )
+            docs = await self.batcher.submit(query)
+            self.query_cache.put(query, docs)
+            if self.shared_cache is not None:
+                self.shared_cache.put_background(query, docs)
+        return list(docs)
+
 
 if __name__ == '__main__':
     retriever_obj = Retriever()
@@ -91,33 +318,22 @@ if __name__ == '__main__':
     detected_category = detect_category_from_query(user_query)
     print(f"\n[INFO] Detected category: {detected_category}")
 
-    # Step 1: Basic retrieval
-    results = retriever_obj.call_retriever(user_query)
-
-    # Step 2: Filter by category
-    if detected_category != "unknown":
-        category_filtered_results = [doc for doc in results if doc.metadata.get("category") == detected_category]
-    else:
-        category_filtered_results = results
-
-    if not category_filtered_results:
-        print(f"⚠️ No results found for category '{detected_category}'. Falling back to general results.")
-        category_filtered_results = results
-    else:
-        print(f"✅ Found {len(category_filtered_results)} results for category '{detected_category}'.")
+    # Step 1: Retrieve rerank candidates, restricted to the detected category inside the FAISS search
+    results = retriever_obj.retrieve_candidates(user_query)
+    print(f"✅ Found {len(results)} results for category '{detected_category}'.")
 
     print("\n🔎 [Filtered Results]")
-    for idx, doc in enumerate(category_filtered_results, 1):
+    for idx, doc in enumerate(results, 1):
         print(f"Result {idx}: {doc.page_content}\nMetadata: {doc.metadata}\n")
 
-    # Step 3: Validate Document types
-    valid_docs = [doc for doc in category_filtered_results if isinstance(doc, Document)]
+    # Step 2: Validate Document types
+    valid_docs = [doc for doc in results if isinstance(doc, Document)]
 
-    # Step 4: Initialize LLM
+    # Step 3: Initialize LLM
     llm = ModelLoader().load_llm()
 
-    # Step 5: Rerank
-    reranked = retriever_obj.rerank_documents(user_query, valid_docs, llm)
+    # Step 4: Rerank
+    reranked = retriever_obj.rerank_listwise(user_query, valid_docs, llm)
 
     print("\n🏅 [After Reranking]")
     for idx, doc in enumerate(reranked, 1):
@@ -0,0 +1,71 @@
+import os
+import sys
+
+import faiss
+import numpy as np
+import pytest
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from utils.faiss_store import filtered_search_params, set_search_params, save_faiss_store, load_faiss_store, search_vectors
+from langchain_core.documents import Document
+from langchain_community.vectorstores import FAISS
+from langchain_community.vectorstores.utils import DistanceStrategy
+from langchain_community.docstore.in_memory import InMemoryDocstore
+
+DIM = 32
+N = 2000
+
+
+def _build(layout: str) -> faiss.Index:
+    if layout == "HNSW":
+        index = faiss.IndexHNSWFlat(DIM, 16, faiss.METRIC_INNER_PRODUCT)
+    elif layout == "HNSWSQ":
+        index = faiss.IndexHNSWSQ(DIM, faiss.ScalarQuantizer.QT_8bit, 16, faiss.METRIC_INNER_PRODUCT)
+    else:
+        index = faiss.index_factory(DIM, layout, faiss.METRIC_INNER_PRODUCT)
+    xb = np.random.default_rng(0).standard_normal((N, DIM)).astype(np.float32)
+    faiss.normalize_L2(xb)
+    if not index.is_trained:
+        index.train(xb)
+    index.add(xb)
+    set_search_params(index, nprobe=4, ef_search=32)
+    return index
+
+
+@pytest.mark.parametrize("layout", ["IVF16,Flat", "IVF16,PQ8x8", "OPQ8,IVF16,PQ8x8", "HNSW", "HNSWSQ", "Flat"])
+def test_filtered_search_only_returns_selected_ids(layout):
+    index = _build(layout)
+    allowed = np.arange(0, N, 2, dtype=np.int64)
+    xq = np.random.default_rng(1).standard_normal((5, DIM)).astype(np.float32)
+
+    _, ids = index.search(xq, 10, params=filtered_search_params(index, allowed))
+
+    hits = ids[ids != -1]
+    assert hits.size > 0
+    assert np.isin(hits, allowed).all()
+
+
+@pytest.mark.parametrize("layout", ["IVF16,Flat", "OPQ8,IVF16,PQ8x8", "HNSW", "HNSWSQ", "Flat"])
+def test_mmap_store_round_trip(tmp_path, layout):
+    index = _build(layout)
+    n = index.ntotal
+    vstore = FAISS(
+        embedding_function=None,
+        index=index,
+        docstore=InMemoryDocstore({str(i): Document(page_content=f"doc {i}", metadata={"category": "x"}) for i in range(n)}),
+        index_to_docstore_id={i: str(i) for i in range(n)},
+        distance_strategy=DistanceStrategy.MAX_INNER_PRODUCT
+    )
+    save_faiss_store(vstore, str(tmp_path))
+
+    loaded = load_faiss_store(str(tmp_path), embeddings=None, mmap=True)
+    xq = np.random.default_rng(1).standard_normal((2, DIM)).astype(np.float32)
+
+    assert loaded.index.ntotal == n
+    assert all(len(docs) == 5 for docs in search_vectors(loaded, xq, 5))
+    # The search parameters chosen at build time come back with the index
+    ivf = faiss.try_extract_index_ivf(loaded.index)
+    if ivf is not None:
+        assert ivf.nprobe == 4
+    if isinstance(loaded.index, faiss.IndexHNSW):
+        assert loaded.index.hnsw.efSearch == 32
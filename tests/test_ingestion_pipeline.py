@@ -0,0 +1,30 @@
+import os
+import sys
+
+import pytest
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from data_ingestion.ingestion_pipeline import _chunk_text, CHUNK_SIZE, CHUNK_OVERLAP
+
+
+@pytest.mark.parametrize("length, expected", [
+    (511, [511]),
+    (512, [512]),
+    (513, [512, 51]),
+    (925, [512, 463]),
+    (926, [512, 464]),
+    (974, [512, 512]),
+    (975, [512, 512, 51]),
+])
+def test_chunk_lengths(length, expected):
+    assert [len(chunk) for chunk in _chunk_text("x" * length)] == expected
+
+
+@pytest.mark.parametrize("length", [513, 925, 975, 2000])
+def test_chunks_cover_text_without_contained_tail(length):
+    text = "".join(chr(ord("a") + i % 26) for i in range(length))
+    chunks = _chunk_text(text)
+    step = CHUNK_SIZE - CHUNK_OVERLAP
+    assert "".join(chunk[:step] for chunk in chunks[:-1]) + chunks[-1] == text
+    # The last window must reach past the end of the one before it
+    assert len(chunks[-1]) > CHUNK_OVERLAP
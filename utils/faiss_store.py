@@ -0,0 +1,139 @@
+import os
+import json
+import faiss
+import numpy as np
+import pandas as pd
+from typing import Dict, List
+from langchain_core.documents import Document
+from langchain_community.vectorstores import FAISS
+from langchain_community.vectorstores.utils import DistanceStrategy
+from langchain_community.docstore.in_memory import InMemoryDocstore
+
+INDEX_FILE = "index.faiss"
+DOCSTORE_FILE = "docstore.parquet"
+LAYOUT_FILE = "index_layout.json"
+
+
+def set_search_params(index: faiss.Index, nprobe: int = None, ef_search: int = None) -> None:
+    """
+    Apply query-time search parameters to whichever index type was built:
+    nprobe for IVF indexes (including ones wrapped by index_factory), efSearch for HNSW.
+    """
+    ivf = faiss.try_extract_index_ivf(index)
+    if ivf is not None and nprobe:
+        ivf.nprobe = min(nprobe, ivf.nlist)
+    if isinstance(index, faiss.IndexHNSW) and ef_search:
+        index.hnsw.efSearch = ef_search
+
+
+def category_id_map(vstore: FAISS) -> Dict[str, np.ndarray]:
+    """
+    Map each metadata category to the int64 FAISS ids of its documents.
+    """
+    ids = np.fromiter(vstore.index_to_docstore_id.keys(), dtype=np.int64, count=len(vstore.index_to_docstore_id))
+    categories = np.array([
+        vstore.docstore.search(doc_id).metadata.get("category") or "" for doc_id in vstore.index_to_docstore_id.values()
+    ])
+    # Group ids by category in one sort rather than appending per document
+    names, inverse, counts = np.unique(categories, return_inverse=True, return_counts=True)
+    groups = np.split(ids[np.argsort(inverse, kind="stable")], np.cumsum(counts)[:-1])
+    return dict(zip(names.tolist(), groups))
+
+
+def filtered_search_params(index: faiss.Index, ids: np.ndarray) -> faiss.SearchParameters:
+    """
+    Search parameters restricting a search to ids, carrying over the index's current
+    nprobe/efSearch since per-call parameters replace the index-level ones.
+    """
+    selector = faiss.IDSelectorBatch(ids)
+    ivf = faiss.try_extract_index_ivf(index)
+    if ivf is not None:
+        params = faiss.SearchParametersIVF(sel=selector, nprobe=ivf.nprobe)
+        if isinstance(index, faiss.IndexPreTransform):
+            # index_factory layouts with a pre-transform (e.g. OPQ) forward params to the IVF stage
+            params = faiss.SearchParametersPreTransform(index_params=params)
+    elif isinstance(index, faiss.IndexHNSW):
+        params = faiss.SearchParametersHNSW(sel=selector, efSearch=index.hnsw.efSearch)
+    else:
+        params = faiss.SearchParameters(sel=selector)
+    return params
+
+
+def search_vectors(vstore: FAISS, vectors: np.ndarray, k: int, params: faiss.SearchParameters = None) -> List[List[Document]]:
+    """
+    Run one index.search over a float32 query matrix and map the hits to documents,
+    one list per query row.
+    """
+    _, ids = vstore.index.search(np.ascontiguousarray(vectors, dtype=np.float32), k, params=params)
+    return [
+        [vstore.docstore.search(vstore.index_to_docstore_id[i]) for i in row if i != -1]
+        for row in ids
+    ]
+
+
+def save_faiss_store(vstore: FAISS, folder_path: str) -> None:
+    """
+    Persist the raw FAISS index with faiss.write_index and the docstore as parquet,
+    instead of LangChain's save_local pickle.
+    """
+    os.makedirs(folder_path, exist_ok=True)
+    faiss.write_index(vstore.index, os.path.join(folder_path, INDEX_FILE))
+    # The loader needs the layout to pick an mmap flag before it can read the index
+    with open(os.path.join(folder_path, LAYOUT_FILE), "w") as f:
+        json.dump({"ivf": faiss.try_extract_index_ivf(vstore.index) is not None}, f)
+
+    # Rows are written in index order, so row i is the document for vector i
+    doc_ids = [vstore.index_to_docstore_id[i] for i in range(vstore.index.ntotal)]
+    docs = [vstore.docstore.search(doc_id) for doc_id in doc_ids]
+    pd.DataFrame({
+        "id": doc_ids,
+        "page_content": [doc.page_content for doc in docs],
+        "metadata": [doc.metadata for doc in docs],
+    }).to_parquet(os.path.join(folder_path, DOCSTORE_FILE), index=False)
+
+
+def index_io_flags(mmap: bool = True, ivf: bool = True) -> int:
+    """
+    IO_FLAG_MMAP only maps IVF inverted lists, and IO_FLAG_MMAP_IFC only maps flat code
+    storage (HNSW, Flat); combining them breaks IVF loading, so pick one by layout.
+    """
+    if not mmap:
+        return 0
+    return (faiss.IO_FLAG_MMAP if ivf else faiss.IO_FLAG_MMAP_IFC) | faiss.IO_FLAG_READ_ONLY
+
+
+def index_is_ivf(folder_path: str) -> bool:
+    try:
+        with open(os.path.join(folder_path, LAYOUT_FILE)) as f:
+            return json.load(f)["ivf"]
+    except FileNotFoundError:
+        # Stores saved before the layout was recorded; IO_FLAG_MMAP reads every layout
+        return True
+
+
+def read_faiss_index(folder_path: str, mmap: bool = True) -> faiss.Index:
+    return faiss.read_index(os.path.join(folder_path, INDEX_FILE), index_io_flags(mmap, index_is_ivf(folder_path)))
+
+
+def load_faiss_store(folder_path: str, embeddings, mmap: bool = True) -> FAISS:
+    """
+    Load a store written by save_faiss_store. With mmap the index is memory-mapped
+    read-only: IVF inverted lists, or the vector codes of HNSW/Flat indexes, are paged
+    in on demand and shared between worker processes instead of copied onto each heap.
+    The HNSW graph links are still read into memory. Nothing is unpickled.
+    """
+    index = read_faiss_index(folder_path, mmap)
+
+    df = pd.read_parquet(os.path.join(folder_path, DOCSTORE_FILE))
+    docstore = InMemoryDocstore({
+        doc_id: Document(page_content=content, metadata=metadata)
+        for doc_id, content, metadata in zip(df["id"], df["page_content"], df["metadata"])
+    })
+
+    return FAISS(
+        embedding_function=embeddings,
+        index=index,
+        docstore=docstore,
+        index_to_docstore_id=dict(enumerate(df["id"])),
+        distance_strategy=DistanceStrategy.MAX_INNER_PRODUCT
+    )
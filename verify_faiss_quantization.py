@@ -1,18 +1,21 @@
 import os
 import faiss
+from utils.faiss_store import index_io_flags, index_is_ivf
 
-def verify_faiss_quantization(index_path: str = "faiss_index/index.faiss"):
+def verify_faiss_quantization(index_path: str = "faiss_index/index.faiss", mmap: bool = True):
     if not os.path.exists(index_path):
         raise FileNotFoundError(f"FAISS index file not found at: {index_path}")
 
-    # Load FAISS index from file
-    index = faiss.read_index(index_path)
+    # Load FAISS index from file the same way the retriever does
+    index = faiss.read_index(index_path, index_io_flags(mmap, index_is_ivf(os.path.dirname(index_path))))
 
     print("🔍 FAISS Index Verification Report")
     print("-" * 50)
     print(f"Index Type             : {type(index)}")
     print(f"Is Trained?            : {index.is_trained}")
     print(f"Total Vectors Indexed  : {index.ntotal}")
+    print(f"Memory-mapped          : {mmap}")
+    print(f"Metric                 : {'inner product' if index.metric_type == faiss.METRIC_INNER_PRODUCT else 'L2'}")
 
     # Check if quantizer exists
     if hasattr(index, 'quantizer'):
@@ -25,10 +28,21 @@ def verify_faiss_quantization(index_path: str = "faiss_index/index.faiss"):
             print(f"-> nlist (centroids)   : {getattr(index, 'nlist', 'N/A')}")
             print(f"-> M (subquantizers)   : {getattr(index, 'pq').M}")
             print(f"-> nbits per subvector : {getattr(index, 'pq').nbits}")
+            print(f"-> nprobe              : {getattr(index, 'nprobe', 'N/A')}")
         except AttributeError as e:
             print("⚠️  Could not access PQ parameters:", e)
+    elif isinstance(index, faiss.IndexHNSW):
+        print(f"✅ Graph index ({type(index).__name__}), sized for a small corpus")
+        print(f"-> efConstruction      : {index.hnsw.efConstruction}")
+        print(f"-> efSearch            : {index.hnsw.efSearch}")
     else:
-        print("❌ This index is not using IVF+PQ quantization.")
+        ivf = faiss.try_extract_index_ivf(index)
+        if ivf is not None:
+            print(f"✅ IVF index built via index_factory ({type(ivf)})")
+            print(f"-> nlist (centroids)   : {ivf.nlist}")
+            print(f"-> nprobe              : {ivf.nprobe}")
+        else:
+            print("❌ This index is not using IVF+PQ quantization.")
 
 if __name__ == "__main__":
     verify_faiss_quantization()